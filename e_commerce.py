@@ -3,6 +3,8 @@ from flask_wtf.csrf import CSRFProtect
 from routes.users.users import users_bp
 from routes.products.products import products_bp
 from routes.orders.orders import orders_bp
+from routes.security.security import security_bp
+from routes.jobs.jobs import jobs_bp, start_workers
 import os
 
 app = Flask(__name__, template_folder='templates', static_folder='static')
@@ -22,6 +24,13 @@ app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 app.register_blueprint(users_bp, url_prefix="/users")
 app.register_blueprint(products_bp, url_prefix="/products")
 app.register_blueprint(orders_bp, url_prefix="/orders")
+app.register_blueprint(security_bp, url_prefix="/security")
+app.register_blueprint(jobs_bp, url_prefix="/jobs")
+
+# background workers for deferred side effects (thumbnails, rollups, notifications);
+# under the debug reloader only the child process that serves requests runs them
+if __name__ != "__main__" or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+    start_workers()
 
 @app.route("/")
 def home():
@@ -0,0 +1,8 @@
+# gunicorn loads this file automatically from the working directory.
+
+
+def post_fork(server, worker):
+    # with --preload the app is imported once in the master, and the job
+    # worker threads started there do not survive the fork into each worker
+    from routes.jobs.jobs import start_workers
+    start_workers()
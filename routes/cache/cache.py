@@ -0,0 +1,119 @@
+import functools
+import os
+import sqlite3
+import threading
+import time
+
+# Shared change counters for every worker process. A writer bumps the
+# version of a table (and optionally of single rows) after its write
+# lands on disk; readers compare the version with the one their cached
+# copy was loaded at and reload only when it moved. The file's stat is
+# part of the check too, so writes that bypass write_excel (setup_data.py,
+# manual edits) are picked up as well.
+VERSIONS_DB = "data/cache_versions.db"
+
+_TABLE_ROW = ""  # row key used for the table-level counter
+
+os.makedirs("data", exist_ok=True)
+
+_local = threading.local()
+
+
+# ---------------- Helper Functions ----------------
+def _connect():
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "pid", None) != os.getpid():
+        conn = sqlite3.connect(VERSIONS_DB, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS versions (
+                tbl TEXT NOT NULL,
+                row TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                PRIMARY KEY (tbl, row)
+            )"""
+        )
+        _local.conn = conn
+        _local.pid = os.getpid()
+    return conn
+
+
+def bump(table, rows=()):
+    """Broadcast a write to ``table`` (and the given row keys) to all workers.
+
+    New counters start from the current time in nanoseconds, so a version
+    cached before the counter file was recreated can never match again.
+    """
+    conn = _connect()
+    keys = [_TABLE_ROW] + [str(r) for r in rows]
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for key in keys:
+            conn.execute(
+                "INSERT INTO versions (tbl, row, version) VALUES (?, ?, ?) "
+                "ON CONFLICT (tbl, row) DO UPDATE SET version = version + 1",
+                (table, key, time.time_ns())
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def row_version(table, row=_TABLE_ROW):
+    found = _connect().execute(
+        "SELECT version FROM versions WHERE tbl = ? AND row = ?", (table, str(row))
+    ).fetchone()
+    return found[0] if found else 0
+
+
+def table_version(table):
+    return row_version(table)
+
+
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def cached(table, path):
+    """Memoize a zero-argument DataFrame loader of ``path`` until it changes.
+
+    The cache is dropped when ``table`` is bumped or the file's inode, size
+    or mtime moves. Loaders should raise on a bad read: an exception is
+    never cached, so one bad parse cannot pin an empty table. Callers get
+    a copy, so mutating the result never leaks into the cache.
+    """
+    def decorator(func):
+        state = {"version": None, "df": None}
+        lock = threading.Lock()
+
+        @functools.wraps(func)
+        def wrapper():
+            # read the version before loading: a write racing with the load
+            # leaves the cache one version behind and forces a reload next time
+            version = (table_version(table), _file_stamp(path))
+            with lock:
+                if state["version"] != version:
+                    state["df"] = func()
+                    state["version"] = version
+                return state["df"].copy()
+
+        return wrapper
+    return decorator
+
+
+def write_excel(df, path, table, rows=()):
+    """Atomically replace ``path`` with ``df`` and bump ``table``.
+
+    The file is written to a temporary name and swapped into place, so
+    readers in other workers never parse (and cache) a half-written file.
+    """
+    root, ext = os.path.splitext(path)
+    tmp = f"{root}.{os.getpid()}.{threading.get_ident()}.tmp{ext}"
+    df.to_excel(tmp, index=False, engine="openpyxl")
+    os.replace(tmp, path)
+    bump(table, rows)
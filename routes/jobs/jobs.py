@@ -0,0 +1,277 @@
+from flask import Blueprint, jsonify, redirect, url_for, session, abort
+from datetime import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+
+jobs_bp = Blueprint("jobs_bp", __name__)
+
+JOBS_DB = "data/jobs.db"
+
+WORKER_THREADS = 2
+MAX_ATTEMPTS = 5
+POLL_INTERVAL = 0.5     # seconds an idle worker sleeps before polling again
+LEASE_SECONDS = 300     # running jobs older than this are assumed dead and retried
+LATENCY_WINDOW = 100    # recent finished jobs used for latency stats
+RETENTION_SECONDS = 7 * 24 * 3600   # finished jobs older than this are purged
+PURGE_INTERVAL = 60
+
+os.makedirs("data", exist_ok=True)
+
+_handlers = {}
+_workers = []
+_workers_lock = threading.Lock()
+_wakeup = threading.Event()
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = False
+_last_purge = 0.0
+
+
+# ---------------- Helper Functions ----------------
+def _init_schema(conn):
+    global _schema_ready
+    with _schema_lock:
+        if _schema_ready:
+            return
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                idempotency_key TEXT UNIQUE,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                enqueued_at REAL NOT NULL,
+                run_at REAL NOT NULL,
+                claimed_at REAL,
+                finished_at REAL
+            )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, run_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_queued_name ON jobs (name, status)")
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (status, finished_at)")
+        _schema_ready = True
+
+
+def _connect():
+    # one connection per thread, reopened after a fork
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "pid", None) != os.getpid():
+        conn = sqlite3.connect(JOBS_DB, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        _init_schema(conn)
+        _local.conn = conn
+        _local.pid = os.getpid()
+    return conn
+
+
+def task(name):
+    """Register a function as the handler for background jobs called ``name``."""
+    def decorator(func):
+        _handlers[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, idempotency_key=None, coalesce=False):
+    """Persist a job and return immediately.
+
+    A job whose ``idempotency_key`` was already enqueued is ignored, so
+    retried requests never schedule the same side effect twice. With
+    ``coalesce`` the job is also skipped while another job of the same
+    name is still waiting to be claimed, since that run will cover it.
+    """
+    now = time.time()
+    conn = _connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        pending = coalesce and conn.execute(
+            "SELECT 1 FROM jobs WHERE name = ? AND status = 'queued' AND attempts = 0 LIMIT 1",
+            (name,)
+        ).fetchone()
+        if not pending:
+            conn.execute(
+                "INSERT OR IGNORE INTO jobs (name, payload, idempotency_key, enqueued_at, run_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (name, json.dumps(payload or {}), idempotency_key, now, now)
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    _wakeup.set()
+
+
+def _claim(conn):
+    """Claim the next ready job; its ``claimed_at`` doubles as the lease token.
+
+    A job whose lease expired while running counts that run as a failed
+    attempt, so a job that keeps killing its worker cannot loop forever.
+    """
+    now = time.time()
+    job = None
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        while job is None:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE (status = 'queued' AND run_at <= ?) "
+                "OR (status = 'running' AND claimed_at < ?) ORDER BY run_at, id LIMIT 1",
+                (now, now - LEASE_SECONDS)
+            ).fetchone()
+            if row is None:
+                break
+            attempts = row["attempts"] + (1 if row["status"] == "running" else 0)
+            if attempts >= MAX_ATTEMPTS:
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', attempts = ?, last_error = ? WHERE id = ?",
+                    (attempts, "Lease expired", row["id"])
+                )
+                continue
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = ?, claimed_at = ? WHERE id = ?",
+                (attempts, now, row["id"])
+            )
+            job = dict(row, status="running", attempts=attempts, claimed_at=now)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return job
+
+
+def _run(conn, job):
+    handler = _handlers.get(job["name"])
+    # results are only recorded while this run still holds the lease; a run
+    # whose lease expired and was re-claimed elsewhere is dropped
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job '{job['name']}'")
+        handler(json.loads(job["payload"]))
+    except Exception:
+        attempts = job["attempts"] + 1
+        status = "failed" if attempts >= MAX_ATTEMPTS else "queued"
+        conn.execute(
+            "UPDATE jobs SET status = ?, attempts = ?, last_error = ?, run_at = ? "
+            "WHERE id = ? AND status = 'running' AND claimed_at = ?",
+            (status, attempts, traceback.format_exc(limit=3), time.time() + 2 ** attempts,
+             job["id"], job["claimed_at"])
+        )
+    else:
+        conn.execute(
+            "UPDATE jobs SET status = 'done', attempts = ?, finished_at = ? "
+            "WHERE id = ? AND status = 'running' AND claimed_at = ?",
+            (job["attempts"] + 1, time.time(), job["id"], job["claimed_at"])
+        )
+
+
+def run_pending(limit=None):
+    """Process ready jobs on the calling thread; returns how many ran."""
+    conn = _connect()
+    ran = 0
+    while limit is None or ran < limit:
+        job = _claim(conn)
+        if job is None:
+            break
+        _run(conn, job)
+        ran += 1
+    return ran
+
+
+def purge_finished(older_than=RETENTION_SECONDS):
+    """Delete finished jobs older than ``older_than`` seconds; failed ones are kept."""
+    cur = _connect().execute(
+        "DELETE FROM jobs WHERE status = 'done' AND finished_at < ?", (time.time() - older_than,)
+    )
+    return cur.rowcount
+
+
+def _worker_loop():
+    while True:
+        try:
+            if run_pending():
+                continue
+            _maybe_purge()
+        except sqlite3.Error:
+            traceback.print_exc()
+        _wakeup.wait(POLL_INTERVAL)
+        _wakeup.clear()
+
+
+def _maybe_purge():
+    global _last_purge
+    now = time.time()
+    if now - _last_purge >= PURGE_INTERVAL:
+        _last_purge = now
+        purge_finished()
+
+
+def _reset_after_fork():
+    # threads are not copied into a forked child, so forget the parent's
+    # workers (and any lock state) and let start_workers run again
+    global _workers_lock, _schema_lock, _wakeup
+    _workers.clear()
+    _workers_lock = threading.Lock()
+    _schema_lock = threading.Lock()
+    _wakeup = threading.Event()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def start_workers(threads=WORKER_THREADS):
+    """Start the background worker threads for this process (idempotent).
+
+    Forked children start with no workers; under gunicorn --preload the
+    post_fork hook in gunicorn.conf.py calls this again in each worker.
+    """
+    with _workers_lock:
+        if _workers:
+            return
+        for i in range(threads):
+            t = threading.Thread(target=_worker_loop, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            _workers.append(t)
+
+
+def queue_stats():
+    now = time.time()
+    conn = _connect()
+    counts = {r["status"]: r["n"] for r in conn.execute(
+        "SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"
+    )}
+    oldest = conn.execute(
+        "SELECT MIN(enqueued_at) FROM jobs WHERE status = 'queued'"
+    ).fetchone()[0]
+    recent = [r[0] for r in conn.execute(
+        "SELECT finished_at - enqueued_at FROM jobs WHERE status = 'done' "
+        "ORDER BY finished_at DESC LIMIT ?", (LATENCY_WINDOW,)
+    )]
+
+    return {
+        "depth": counts.get("queued", 0) + counts.get("running", 0),
+        "queued": counts.get("queued", 0),
+        "running": counts.get("running", 0),
+        "done": counts.get("done", 0),
+        "failed": counts.get("failed", 0),
+        "oldest_queued_age": round(now - oldest, 3) if oldest else 0.0,
+        "avg_latency": round(sum(recent) / len(recent), 3) if recent else 0.0,
+        "max_latency": round(max(recent), 3) if recent else 0.0,
+        "workers": len(_workers),
+        "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+# ---------------- Routes ----------------
+@jobs_bp.route("/stats")
+def job_stats():
+    if "username" not in session:
+        return redirect(url_for("users_bp.login"))
+    if session.get("role") != "admin":
+        abort(403)
+    return jsonify(queue_stats())
@@ -2,11 +2,14 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 import pandas as pd
 from datetime import datetime
 import os
+from routes.jobs.jobs import task, enqueue
+from routes.cache.cache import cached, write_excel, row_version
 
 orders_bp = Blueprint("orders_bp", __name__)
 
 ORDERS_FILE = "data/orders.xlsx"
 PRODUCTS_FILE = "data/products.xlsx"
+NOTIFICATIONS_FILE = "data/order_notifications.csv"
 
 _required_order_cols = [
     "id", "product_id", "product_name", "price",
@@ -16,16 +19,21 @@ _required_order_cols = [
 os.makedirs("data", exist_ok=True)
 
 if not os.path.exists(ORDERS_FILE):
-    pd.DataFrame(columns=_required_order_cols).to_excel(ORDERS_FILE, index=False, engine="openpyxl")
+    write_excel(pd.DataFrame(columns=_required_order_cols), ORDERS_FILE, "orders")
 
 if not os.path.exists(PRODUCTS_FILE):
-    pd.DataFrame(columns=["id", "name", "description", "price", "stock", "image", "seller"]).to_excel(PRODUCTS_FILE, index=False, engine="openpyxl")
+    write_excel(pd.DataFrame(columns=["id", "name", "description", "price", "stock", "image", "seller"]), PRODUCTS_FILE, "products")
 
 
 # ---------- Helper functions ----------
+@cached("orders", ORDERS_FILE)
+def _load_orders_df():
+    return pd.read_excel(ORDERS_FILE, engine="openpyxl")
+
+
 def read_orders_df():
     try:
-        df = pd.read_excel(ORDERS_FILE, engine="openpyxl")
+        df = _load_orders_df()
     except Exception:
         df = pd.DataFrame(columns=_required_order_cols)
 
@@ -49,20 +57,46 @@ def read_orders_df():
     return df
 
 
-def write_orders_df(df):
-    df.to_excel(ORDERS_FILE, index=False, engine="openpyxl")
+def write_orders_df(df, rows=()):
+    write_excel(df, ORDERS_FILE, "orders", rows)
+
+
+@cached("products", PRODUCTS_FILE)
+def _load_products_df():
+    return pd.read_excel(PRODUCTS_FILE, engine="openpyxl")
 
 
 def read_products_df():
     try:
-        df = pd.read_excel(PRODUCTS_FILE, engine="openpyxl")
+        df = _load_products_df()
     except Exception:
         df = pd.DataFrame(columns=["id", "name", "description", "price", "stock", "image", "seller"])
     return df
 
 
-def write_products_df(df):
-    df.to_excel(PRODUCTS_FILE, index=False, engine="openpyxl")
+def write_products_df(df, rows=()):
+    write_excel(df, PRODUCTS_FILE, "products", rows)
+
+
+def queue_status_notification(order_id, customer, seller, status):
+    enqueue(
+        "order_status_notification",
+        {"order_id": int(order_id), "customer": customer, "seller": seller, "status": status},
+        # the row version makes every transition unique, even back to an earlier status
+        idempotency_key=f"order-status:{int(order_id)}:{status}:{row_version('orders', int(order_id))}"
+    )
+
+
+@task("order_status_notification")
+def notify_order_status(payload):
+    """Record an order status change in the notification outbox."""
+    time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    entry = pd.DataFrame(
+        [[payload["order_id"], payload["customer"], payload["seller"], payload["status"], time]],
+        columns=["order_id", "customer", "seller", "status", "timestamp"]
+    )
+    write_header = not os.path.exists(NOTIFICATIONS_FILE) or os.stat(NOTIFICATIONS_FILE).st_size == 0
+    entry.to_csv(NOTIFICATIONS_FILE, mode="a", header=write_header, index=False)
 
 
 # ---------- Routes ----------
@@ -107,11 +141,13 @@ def buy_product(pid):
     )
 
     orders_df = pd.concat([orders_df, new_order], ignore_index=True)
-    write_orders_df(orders_df)
+    write_orders_df(orders_df, rows=[new_id])
 
     # Decrease stock
     products_df.loc[products_df["id"] == pid, "stock"] = stock - quantity
-    write_products_df(products_df)
+    write_products_df(products_df, rows=[pid])
+
+    queue_status_notification(new_id, session["username"], p["seller"], "Pending")
 
     flash("Order placed successfully!", "success")
     return redirect(url_for("orders_bp.customer_orders"))
@@ -179,7 +215,10 @@ def update_order_status(oid):
         return redirect(url_for("orders_bp.admin_orders"))
 
     df.loc[df["id"] == oid, "status"] = new_status
-    write_orders_df(df)
+    write_orders_df(df, rows=[oid])
+
+    order = df[df["id"] == oid].iloc[0]
+    queue_status_notification(oid, order["customer"], order["seller"], new_status)
 
     flash("Order status updated successfully!", "success")
 
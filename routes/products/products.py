@@ -2,11 +2,16 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 import pandas as pd
 import os
 from werkzeug.utils import secure_filename
+from PIL import Image
+from routes.jobs.jobs import task, enqueue
+from routes.cache.cache import cached, write_excel
 
 products_bp = Blueprint("products_bp", __name__)
 
 PRODUCTS_FILE = "data/products.xlsx"
 UPLOAD_FOLDER = "static/uploads"
+THUMB_FOLDER = os.path.join(UPLOAD_FOLDER, "thumbs")
+THUMB_SIZE = (300, 300)
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif"}
 
 os.makedirs("data", exist_ok=True)
@@ -16,13 +21,18 @@ _required_product_cols = ["id", "name", "description", "price", "stock", "image"
 
 # Initialize Excel file if missing
 if not os.path.exists(PRODUCTS_FILE):
-    pd.DataFrame(columns=_required_product_cols).to_excel(PRODUCTS_FILE, index=False, engine="openpyxl")
+    write_excel(pd.DataFrame(columns=_required_product_cols), PRODUCTS_FILE, "products")
 
 
 # ---------------- Helper Functions ----------------
+@cached("products", PRODUCTS_FILE)
+def _load_products_df():
+    return pd.read_excel(PRODUCTS_FILE, engine="openpyxl")
+
+
 def read_products_df():
     try:
-        df = pd.read_excel(PRODUCTS_FILE, engine="openpyxl")
+        df = _load_products_df()
     except Exception:
         df = pd.DataFrame(columns=_required_product_cols)
     for c in _required_product_cols:
@@ -31,14 +41,46 @@ def read_products_df():
     return df
 
 
-def write_products_df(df):
-    df.to_excel(PRODUCTS_FILE, index=False, engine="openpyxl")
+def write_products_df(df, rows=()):
+    write_excel(df, PRODUCTS_FILE, "products", rows)
 
 
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def queue_thumbnail(filename):
+    image_path = os.path.join(UPLOAD_FOLDER, filename)
+    # drop a thumbnail of a previous upload with the same name until the new one is built
+    thumb_path = os.path.join(THUMB_FOLDER, filename)
+    if os.path.exists(thumb_path):
+        os.remove(thumb_path)
+    key = f"thumbnail:{filename}:{os.stat(image_path).st_mtime_ns}"
+    enqueue("thumbnail", {"filename": filename}, idempotency_key=key)
+
+
+@task("thumbnail")
+def make_thumbnail(payload):
+    filename = payload["filename"]
+    os.makedirs(THUMB_FOLDER, exist_ok=True)
+    thumb_path = os.path.join(THUMB_FOLDER, filename)
+    root, ext = os.path.splitext(thumb_path)
+    tmp = f"{root}.{os.getpid()}.tmp{ext}"
+    with Image.open(os.path.join(UPLOAD_FOLDER, filename)) as img:
+        img.thumbnail(THUMB_SIZE)
+        img.save(tmp)
+    # swap in place so pages never serve a half-written thumbnail
+    os.replace(tmp, thumb_path)
+
+
+@products_bp.app_template_global()
+def product_image_url(filename):
+    """Thumbnail URL for a product image, or the original until the thumbnail is ready."""
+    if os.path.exists(os.path.join(THUMB_FOLDER, filename)):
+        return url_for("static", filename="uploads/thumbs/" + filename)
+    return url_for("static", filename="uploads/" + filename)
+
+
 # ---------------- Routes ----------------
 @products_bp.route("/list")
 def list_products():
@@ -91,6 +133,7 @@ def add_product():
                 filename = secure_filename(image_file.filename)
                 image_path = os.path.join(UPLOAD_FOLDER, filename)
                 image_file.save(image_path)
+                queue_thumbnail(filename)
             else:
                 flash("Invalid image type", "danger")
                 return redirect(url_for("products_bp.add_product"))
@@ -100,7 +143,7 @@ def add_product():
         new_product = pd.DataFrame([[new_id, name, desc, price, stock, filename, session["username"]]],
                                    columns=_required_product_cols)
         df = pd.concat([df, new_product], ignore_index=True)
-        write_products_df(df)
+        write_products_df(df, rows=[new_id])
 
         flash("✅ Product added successfully!", "success")
         return redirect(url_for("products_bp.seller_products"))
@@ -144,12 +187,13 @@ def edit_product(pid):
                 filename = secure_filename(image_file.filename)
                 image_path = os.path.join(UPLOAD_FOLDER, filename)
                 image_file.save(image_path)
+                queue_thumbnail(filename)
                 df.loc[df["id"] == pid, "image"] = filename
             else:
                 flash("Invalid image type", "danger")
                 return redirect(url_for("products_bp.edit_product", pid=pid))
 
-        write_products_df(df)
+        write_products_df(df, rows=[pid])
         flash("Product updated successfully!", "success")
         return redirect(url_for("products_bp.seller_products"))
 
@@ -180,7 +224,7 @@ def delete_product(pid):
         abort(403)
 
     df = df[df["id"] != pid].reset_index(drop=True)
-    write_products_df(df)
+    write_products_df(df, rows=[pid])
     flash("Product deleted successfully!", "success")
 
     if role == "seller":
@@ -0,0 +1,293 @@
+from flask import Blueprint, render_template, redirect, url_for, session, abort
+import pandas as pd
+from io import StringIO
+import json
+import time
+import os
+import threading
+from routes.jobs.jobs import task, enqueue
+
+security_bp = Blueprint("security_bp", __name__)
+
+SECURITY_LOG = "data/security_log.csv"
+SECURITY_ROLLUP = "data/security_rollup.json"
+
+_log_cols = ["username", "status", "timestamp"]
+
+# Lines parsed per pandas chunk; keeps memory bounded on very large logs
+CHUNK_LINES = 50000
+
+# Anomaly thresholds
+NO_SUCH_USER_BURST = 5      # "Failed (No such user)" events in a single hour
+USER_FAILED_THRESHOLD = 5   # failed logins for a single username in a single day
+TOP_N = 10
+HOURS_SHOWN = 48
+
+# Rollup size limits; attacker-chosen usernames must not grow state unbounded
+MAX_UNKNOWN_USERS = 1000    # distinct "No such user" names kept, by failure count
+MAX_HOURS = 24 * 90         # hourly buckets kept
+MAX_DAYS = 7                # daily per-user failure buckets kept
+MAX_DAILY_USERS = 1000      # usernames kept per daily bucket, by failure count
+
+# Time budgets for catching up on the log, so a huge backlog never blocks
+# a request or outlives the job lease; progress is saved after every chunk
+VIEW_CATCHUP_SECONDS = 5
+JOB_CATCHUP_SECONDS = 60
+
+os.makedirs("data", exist_ok=True)
+
+_rollup_lock = threading.Lock()
+
+
+# ---------------- Helper Functions ----------------
+def _empty_rollup():
+    return {
+        "offset": 0,
+        "total": 0,
+        "failed": 0,
+        "statuses": {},
+        "users": {},
+        "unknown_users": {},
+        "unknown_other": 0,
+        "hours": {},
+        "failed_days": {},
+    }
+
+
+def read_rollup():
+    try:
+        with open(SECURITY_ROLLUP, "r", encoding="utf-8") as f:
+            rollup = json.load(f)
+    except (OSError, ValueError):
+        rollup = _empty_rollup()
+    for k, v in _empty_rollup().items():
+        rollup.setdefault(k, v)
+    return rollup
+
+
+def write_rollup(rollup):
+    # write to a temp file first so a crash never leaves a half-written rollup
+    tmp = f"{SECURITY_ROLLUP}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(rollup, f)
+    os.replace(tmp, SECURITY_ROLLUP)
+
+
+def _bump(counter, key, total, failed):
+    entry = counter.setdefault(key, {"total": 0, "failed": 0})
+    entry["total"] += int(total)
+    entry["failed"] += int(failed)
+    return entry
+
+
+def _parse_lines(lines):
+    # an unbalanced quote would swallow every following line, so drop those
+    # lines up front; the rest is parsed in one call, skipping rows with the
+    # wrong field count and leaving "NA", "null", ... as plain strings
+    text = "".join(line for line in lines if line.count('"') % 2 == 0)
+    if not text:
+        return pd.DataFrame(columns=_log_cols)
+    df = pd.read_csv(StringIO(text), names=_log_cols, header=None, dtype=str,
+                     keep_default_na=False, on_bad_lines="skip", engine="python")
+    return df.dropna()
+
+
+def _trim(counter, limit):
+    """Keep the ``limit`` entries with most failures; return the dropped event count."""
+    if len(counter) <= limit:
+        return 0
+    ranked = sorted(counter.items(), key=lambda x: (x[1]["failed"], x[1]["total"]), reverse=True)
+    for key, entry in ranked[limit:]:
+        del counter[key]
+    return sum(entry["total"] for _, entry in ranked[limit:])
+
+
+def _apply_chunk(rollup, lines):
+    """Fold one chunk of raw CSV lines into the rollup using pandas group-bys."""
+    df = _parse_lines(lines)
+    df = df[df["status"] != ""].copy()
+    if df.empty:
+        return
+
+    df["failed"] = df["status"].str.startswith("Failed")
+    df["no_such_user"] = df["status"] == "Failed (No such user)"
+    # validate with the format log_security writes, then bucket by slicing the
+    # string (much cheaper than strftime on every row)
+    valid = pd.to_datetime(df["timestamp"], errors="coerce", format="%Y-%m-%d %H:%M:%S").notna()
+    df["hour"] = df["timestamp"].str.slice(0, 13).where(valid) + ":00"
+    df["day"] = df["timestamp"].str.slice(0, 10).where(valid)
+
+    rollup["total"] += len(df)
+    rollup["failed"] += int(df["failed"].sum())
+
+    for status, count in df["status"].value_counts().items():
+        rollup["statuses"][status] = rollup["statuses"].get(status, 0) + int(count)
+
+    # usernames behind "No such user" are attacker-chosen, so they go to a capped table
+    for key, part in (("users", df[~df["no_such_user"]]), ("unknown_users", df[df["no_such_user"]])):
+        by_user = part.groupby("username").agg(total=("status", "size"), failed=("failed", "sum"))
+        for username, total, failed in zip(by_user.index, by_user["total"], by_user["failed"]):
+            _bump(rollup[key], username, total, failed)
+    rollup["unknown_other"] += _trim(rollup["unknown_users"], MAX_UNKNOWN_USERS)
+
+    by_hour = df.dropna(subset=["hour"]).groupby("hour").agg(
+        total=("status", "size"), failed=("failed", "sum"), no_such_user=("no_such_user", "sum")
+    )
+    for hour, total, failed, no_such_user in zip(by_hour.index, by_hour["total"], by_hour["failed"], by_hour["no_such_user"]):
+        entry = _bump(rollup["hours"], hour, total, failed)
+        entry["no_such_user"] = entry.get("no_such_user", 0) + int(no_such_user)
+    for hour in sorted(rollup["hours"])[:-MAX_HOURS]:
+        del rollup["hours"][hour]
+
+    by_day = df[df["failed"]].dropna(subset=["day"]).groupby(["day", "username"]).size()
+    for (day, username), count in by_day.items():
+        users = rollup["failed_days"].setdefault(day, {})
+        users[username] = users.get(username, 0) + int(count)
+    for day, users in rollup["failed_days"].items():
+        if len(users) > MAX_DAILY_USERS:
+            top = sorted(users.items(), key=lambda x: x[1], reverse=True)[:MAX_DAILY_USERS]
+            rollup["failed_days"][day] = dict(top)
+    for day in sorted(rollup["failed_days"])[:-MAX_DAYS]:
+        del rollup["failed_days"][day]
+
+
+def update_security_rollup(budget=None):
+    """Fold log lines appended since the last run into the rollup.
+
+    Only the bytes after the stored offset are read, so each call costs
+    O(new events) and memory never exceeds one chunk of lines. The rollup
+    and offset are saved after every chunk; with ``budget`` (seconds) the
+    call stops after the chunk that crosses it and leaves the rest for
+    the next call. Returns the rollup and whether the log was fully read.
+    """
+    with _rollup_lock:
+        deadline = time.monotonic() + budget if budget is not None else None
+        return _update_security_rollup(deadline)
+
+
+def _update_security_rollup(deadline):
+    rollup = read_rollup()
+    if not os.path.exists(SECURITY_LOG):
+        return rollup, True
+
+    size = os.path.getsize(SECURITY_LOG)
+    if size < rollup["offset"]:
+        # log was truncated or replaced: rebuild from scratch
+        rollup = _empty_rollup()
+    if size == rollup["offset"]:
+        return rollup, True
+
+    def flush(chunk, offset):
+        if chunk:
+            _apply_chunk(rollup, chunk)
+        rollup["offset"] = offset
+        write_rollup(rollup)
+
+    offset = rollup["offset"]
+    with open(SECURITY_LOG, "rb") as f:
+        f.seek(offset)
+        chunk = []
+        for raw in f:
+            # stop at a partially written trailing line; it is picked up next time
+            if not raw.endswith(b"\n"):
+                break
+            line = raw.decode("utf-8", errors="replace")
+            offset += len(raw)
+            if offset == len(raw) and line.strip() == ",".join(_log_cols):
+                continue
+            chunk.append(line)
+            if len(chunk) >= CHUNK_LINES:
+                flush(chunk, offset)
+                chunk = []
+                if deadline is not None and time.monotonic() >= deadline:
+                    return rollup, False
+        flush(chunk, offset)
+
+    return rollup, True
+
+
+@task("security_rollup")
+def _security_rollup_job(payload):
+    # stay well inside the job lease; a follow-up job continues where this stopped
+    _, done = update_security_rollup(budget=JOB_CATCHUP_SECONDS)
+    if not done:
+        enqueue("security_rollup", coalesce=True)
+
+
+def _all_users(rollup):
+    users = dict(rollup["unknown_users"])
+    for username, entry in rollup["users"].items():
+        if username in users:
+            other = users[username]
+            entry = {k: entry.get(k, 0) + other.get(k, 0) for k in ("total", "failed")}
+        users[username] = entry
+    return users
+
+
+def detect_anomalies(rollup):
+    anomalies = []
+    for hour, entry in sorted(rollup["hours"].items()):
+        if entry.get("no_such_user", 0) >= NO_SUCH_USER_BURST:
+            anomalies.append({
+                "kind": "Unknown-user burst",
+                "subject": hour,
+                "detail": f"{entry['no_such_user']} 'Failed (No such user)' attempts in one hour",
+            })
+    for day, users in sorted(rollup["failed_days"].items()):
+        for username, failed in sorted(users.items()):
+            if failed >= USER_FAILED_THRESHOLD:
+                anomalies.append({
+                    "kind": "Repeated failures",
+                    "subject": username,
+                    "detail": f"{failed} failed logins on {day}",
+                })
+    return anomalies
+
+
+def security_summary():
+    # catch up for a bounded time only; a background job finishes the rest
+    rollup, done = update_security_rollup(budget=VIEW_CATCHUP_SECONDS)
+    if not done:
+        enqueue("security_rollup", coalesce=True)
+    total = rollup["total"]
+    failed = rollup["failed"]
+    logins = failed + rollup["statuses"].get("Success", 0)
+
+    all_users = _all_users(rollup)
+
+    offenders = sorted(
+        ((u, e["failed"]) for u, e in all_users.items() if e["failed"] > 0),
+        key=lambda x: x[1], reverse=True
+    )[:TOP_N]
+    users = sorted(
+        ({"username": u, **e} for u, e in all_users.items()),
+        key=lambda x: x["total"], reverse=True
+    )[:TOP_N]
+    hours = [{"hour": h, **e} for h, e in sorted(rollup["hours"].items(), reverse=True)[:HOURS_SHOWN]]
+
+    return {
+        "total_events": total,
+        "failed_logins": failed,
+        "failed_rate": round(100.0 * failed / logins, 1) if logins else 0.0,
+        "statuses": sorted(rollup["statuses"].items(), key=lambda x: x[1], reverse=True),
+        "top_offenders": offenders,
+        "users": users,
+        "hours": hours,
+        "anomalies": detect_anomalies(rollup),
+        "catching_up": not done,
+    }
+
+
+def admin_required():
+    if "role" not in session or session.get("role") != "admin":
+        abort(403)
+
+
+# ---------------- Routes ----------------
+@security_bp.route("/admin")
+def admin_security():
+    if "username" not in session:
+        return redirect(url_for("users_bp.login"))
+    admin_required()
+    summary = security_summary()
+    return render_template("admin_security.html", user=session["username"], **summary)
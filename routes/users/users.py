@@ -3,6 +3,8 @@ import pandas as pd
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 import os
+from routes.jobs.jobs import enqueue
+from routes.cache.cache import cached, write_excel
 
 users_bp = Blueprint("users_bp", __name__)
 
@@ -13,26 +15,34 @@ os.makedirs("data", exist_ok=True)
 _required_user_cols = ["username", "password", "role", "active", "created_at"]
 
 # Initialize files if missing or fix columns
+# (only rewritten when something is missing, and atomically, since every
+# worker process runs this on import)
 if not os.path.exists(USERS_FILE):
-    pd.DataFrame(columns=_required_user_cols).to_excel(USERS_FILE, index=False, engine="openpyxl")
+    write_excel(pd.DataFrame(columns=_required_user_cols), USERS_FILE, "users")
 else:
     try:
         df_check = pd.read_excel(USERS_FILE, engine="openpyxl")
-        for c in _required_user_cols:
-            if c not in df_check.columns:
-                df_check[c] = None
-        df_check.to_excel(USERS_FILE, index=False, engine="openpyxl")
+        missing = [c for c in _required_user_cols if c not in df_check.columns]
+        for c in missing:
+            df_check[c] = None
+        if missing:
+            write_excel(df_check, USERS_FILE, "users")
     except Exception:
-        pd.DataFrame(columns=_required_user_cols).to_excel(USERS_FILE, index=False, engine="openpyxl")
+        write_excel(pd.DataFrame(columns=_required_user_cols), USERS_FILE, "users")
 
 if not os.path.exists(SECURITY_LOG) or os.stat(SECURITY_LOG).st_size == 0:
     pd.DataFrame(columns=["username", "status", "timestamp"]).to_csv(SECURITY_LOG, index=False)
 
 
 # ---------------- Helper Functions ----------------
+@cached("users", USERS_FILE)
+def _load_users_df():
+    return pd.read_excel(USERS_FILE, engine="openpyxl")
+
+
 def read_users_df():
     try:
-        df = pd.read_excel(USERS_FILE, engine="openpyxl")
+        df = _load_users_df()
     except Exception:
         df = pd.DataFrame(columns=_required_user_cols)
     for c in _required_user_cols:
@@ -41,8 +51,8 @@ def read_users_df():
     return df
 
 
-def write_users_df(df):
-    df.to_excel(USERS_FILE, index=False, engine="openpyxl")
+def write_users_df(df, rows=()):
+    write_excel(df, USERS_FILE, "users", rows)
 
 
 def log_security(username, status):
@@ -51,12 +61,9 @@ def log_security(username, status):
     if not os.path.exists(SECURITY_LOG) or os.stat(SECURITY_LOG).st_size == 0:
         entry.to_csv(SECURITY_LOG, index=False)
     else:
-        try:
-            log_df = pd.read_csv(SECURITY_LOG)
-        except pd.errors.EmptyDataError:
-            log_df = pd.DataFrame(columns=["username", "status", "timestamp"])
-        log_df = pd.concat([log_df, entry], ignore_index=True)
-        log_df.to_csv(SECURITY_LOG, index=False)
+        # append only the new row instead of rewriting the whole log
+        entry.to_csv(SECURITY_LOG, mode="a", header=False, index=False)
+    enqueue("security_rollup", coalesce=True)
 
 
 def admin_required():
@@ -86,7 +93,7 @@ def register():
         created = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         new_user = pd.DataFrame([[username, hashed_password, role, True, created]], columns=_required_user_cols)
         df = pd.concat([df, new_user], ignore_index=True)
-        write_users_df(df)
+        write_users_df(df, rows=[username])
 
         flash("Registration successful! Please login.", "success")
         return redirect(url_for("users_bp.login"))
@@ -213,7 +220,7 @@ def admin_toggle_active(username):
     idx = df.index[df["username"] == username][0]
     current = bool(df.at[idx, "active"]) if pd.notna(df.at[idx, "active"]) else True
     df.at[idx, "active"] = not current
-    write_users_df(df)
+    write_users_df(df, rows=[username])
 
     action = "Reactivated" if df.at[idx, "active"] else "Deactivated"
     log_security(username, f"Admin {action} by {session.get('username')}")
@@ -237,7 +244,7 @@ def admin_delete_user(username):
         return redirect(url_for("users_bp.admin_view_users"))
 
     df = df[df["username"] != username].reset_index(drop=True)
-    write_users_df(df)
+    write_users_df(df, rows=[username])
     log_security(username, f"Deleted by admin {session.get('username')}")
     flash("User deleted successfully.", "success")
     return redirect(url_for("users_bp.admin_view_users"))
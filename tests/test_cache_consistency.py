@@ -0,0 +1,114 @@
+import multiprocessing as mp
+import os
+import shutil
+import threading
+
+import pandas as pd
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ctx = mp.get_context("fork")
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # the route modules use paths relative to the working directory
+    shutil.copytree(os.path.join(REPO, "data"), tmp_path / "data",
+                    ignore=shutil.ignore_patterns("*.db*", "*.json", "order_notifications.csv"))
+    monkeypatch.chdir(tmp_path)
+    from routes.cache import cache
+    # drop the version db connection opened by an earlier test's directory
+    monkeypatch.setattr(cache, "_local", threading.local())
+    return tmp_path
+
+
+def _stock(df, pid):
+    return int(df.loc[df["id"] == pid, "stock"].iloc[0])
+
+
+def _writer(conn, pid):
+    from routes.products import products
+    while True:
+        value = conn.recv()
+        if value is None:
+            return
+        df = products.read_products_df()
+        df.loc[df["id"] == pid, "stock"] = value
+        products.write_products_df(df, rows=[pid])
+        conn.send("ok")
+
+
+def _reader(conn, pid):
+    from routes.cache import cache
+    from routes.orders import orders
+    # blind the file-stamp check so only the version counters can invalidate
+    cache._file_stamp = lambda path: None
+    orders.read_products_df()  # warm the cache before any write happens
+    conn.send("ready")
+    while True:
+        msg = conn.recv()
+        if msg is None:
+            return
+        conn.send(_stock(orders.read_products_df(), pid))
+
+
+def test_read_after_write_across_workers(workdir):
+    from routes.cache import cache
+    from routes.products import products
+    pid = int(products.read_products_df()["id"].iloc[0])
+
+    writer_conn, writer_child = ctx.Pipe()
+    reader_conns, readers = [], []
+    writer = ctx.Process(target=_writer, args=(writer_child, pid))
+    writer.start()
+    for _ in range(2):
+        parent, child = ctx.Pipe()
+        proc = ctx.Process(target=_reader, args=(child, pid))
+        proc.start()
+        assert parent.recv() == "ready"
+        reader_conns.append(parent)
+        readers.append(proc)
+
+    try:
+        version = cache.table_version("products")
+        for value in range(900, 910):
+            writer_conn.send(value)
+            assert writer_conn.recv() == "ok"
+            assert cache.table_version("products") > version
+            version = cache.table_version("products")
+            assert cache.row_version("products", pid) > 0
+            for conn in reader_conns:
+                conn.send("read")
+                assert conn.recv() == value
+    finally:
+        for conn in [writer_conn] + reader_conns:
+            conn.send(None)
+        for proc in [writer] + readers:
+            proc.join(timeout=30)
+
+    assert all(proc.exitcode == 0 for proc in [writer] + readers)
+
+
+def test_failed_read_is_not_cached(workdir):
+    from routes.users import users
+    good = users.read_users_df()
+    assert not good.empty
+
+    os.replace(users.USERS_FILE, "users.good.xlsx")
+    with open(users.USERS_FILE, "wb") as f:
+        f.write(b"not an xlsx file")
+    assert users.read_users_df().empty
+
+    # restored without write_excel or a bump: the file stamp still invalidates
+    os.replace("users.good.xlsx", users.USERS_FILE)
+    assert len(users.read_users_df()) == len(good)
+
+
+def test_external_write_invalidates_cache(workdir):
+    from routes.products import products
+    df = products.read_products_df()
+    pid = int(df["id"].iloc[0])
+
+    df.loc[df["id"] == pid, "stock"] = 4242
+    df.to_excel(products.PRODUCTS_FILE, index=False, engine="openpyxl")
+    assert _stock(products.read_products_df(), pid) == 4242
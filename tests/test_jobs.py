@@ -0,0 +1,128 @@
+import threading
+
+import pytest
+
+from routes.jobs import jobs
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOBS_DB", str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(jobs, "_local", threading.local())
+    monkeypatch.setattr(jobs, "_schema_ready", False)
+    return jobs
+
+
+def _rows(queue, name):
+    return [dict(r) for r in queue._connect().execute(
+        "SELECT * FROM jobs WHERE name = ? ORDER BY id", (name,)
+    )]
+
+
+def _make_ready(queue, name):
+    queue._connect().execute("UPDATE jobs SET run_at = 0 WHERE name = ?", (name,))
+
+
+def test_failed_job_is_retried_after_backoff(queue):
+    calls = []
+
+    @queue.task("test_flaky")
+    def flaky(payload):
+        calls.append(payload)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+
+    queue.enqueue("test_flaky", {"n": 1})
+    assert queue.run_pending() == 1
+    job = _rows(queue, "test_flaky")[0]
+    assert job["status"] == "queued" and job["attempts"] == 1
+    assert "boom" in job["last_error"]
+
+    # still backing off
+    assert queue.run_pending() == 0
+
+    _make_ready(queue, "test_flaky")
+    assert queue.run_pending() == 1
+    job = _rows(queue, "test_flaky")[0]
+    assert job["status"] == "done" and job["attempts"] == 2
+    assert calls == [{"n": 1}, {"n": 1}]
+
+
+def test_job_fails_after_max_attempts(queue):
+    @queue.task("test_broken")
+    def broken(payload):
+        raise RuntimeError("always")
+
+    queue.enqueue("test_broken")
+    for _ in range(queue.MAX_ATTEMPTS):
+        _make_ready(queue, "test_broken")
+        queue.run_pending()
+    job = _rows(queue, "test_broken")[0]
+    assert job["status"] == "failed" and job["attempts"] == queue.MAX_ATTEMPTS
+
+
+def test_idempotency_key_dedupes(queue):
+    queue.task("test_noop")(lambda payload: None)
+    queue.enqueue("test_noop", idempotency_key="k1")
+    queue.enqueue("test_noop", idempotency_key="k1")
+    queue.enqueue("test_noop", idempotency_key="k2")
+    assert len(_rows(queue, "test_noop")) == 2
+
+
+def test_coalesce_skips_while_unclaimed(queue):
+    queue.task("test_rollup")(lambda payload: None)
+    queue.enqueue("test_rollup", coalesce=True)
+    queue.enqueue("test_rollup", coalesce=True)
+    assert len(_rows(queue, "test_rollup")) == 1
+
+    queue.run_pending()
+    queue.enqueue("test_rollup", coalesce=True)
+    assert [r["status"] for r in _rows(queue, "test_rollup")] == ["done", "queued"]
+
+
+def test_purge_finished_keeps_failed_and_recent(queue):
+    queue.task("test_done")(lambda payload: None)
+    queue.enqueue("test_done")
+    queue.enqueue("test_done")
+    queue.run_pending()
+    conn = queue._connect()
+    old, recent = [r["id"] for r in _rows(queue, "test_done")]
+    conn.execute("UPDATE jobs SET finished_at = 0 WHERE id = ?", (old,))
+    conn.execute("UPDATE jobs SET status = 'failed', finished_at = 0 WHERE id = ?", (recent,))
+
+    assert queue.purge_finished() == 1
+    assert [r["status"] for r in _rows(queue, "test_done")] == ["failed"]
+
+
+def test_expired_lease_is_fenced_and_counted(queue):
+    queue.task("test_slow")(lambda payload: None)
+    queue.enqueue("test_slow")
+    conn = queue._connect()
+
+    stale = queue._claim(conn)
+    conn.execute("UPDATE jobs SET claimed_at = claimed_at - ? WHERE id = ?",
+                 (queue.LEASE_SECONDS + 1, stale["id"]))
+    stale["claimed_at"] -= queue.LEASE_SECONDS + 1
+
+    fresh = queue._claim(conn)
+    assert fresh["id"] == stale["id"] and fresh["attempts"] == 1
+
+    # the stale run finishing late must not overwrite the new owner's lease
+    queue._run(conn, stale)
+    assert _rows(queue, "test_slow")[0]["status"] == "running"
+
+    queue._run(conn, fresh)
+    job = _rows(queue, "test_slow")[0]
+    assert job["status"] == "done" and job["attempts"] == 2
+
+
+def test_job_that_keeps_losing_its_lease_fails(queue):
+    queue.task("test_crashy")(lambda payload: None)
+    queue.enqueue("test_crashy")
+    conn = queue._connect()
+    for _ in range(queue.MAX_ATTEMPTS):
+        queue._claim(conn)
+        conn.execute("UPDATE jobs SET claimed_at = 0 WHERE name = 'test_crashy'")
+    assert queue._claim(conn) is None
+    job = _rows(queue, "test_crashy")[0]
+    assert job["status"] == "failed" and job["last_error"] == "Lease expired"